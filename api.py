@@ -1,14 +1,28 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, UploadFile
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
-import json
-import re
+from typing import BinaryIO, List, Dict, Optional
+import asyncio
+import ijson
+import orjson
 import logging
 from datetime import datetime
+from itertools import islice
 import os
-from pymongo import MongoClient
+import shutil
+import tempfile
+import hashlib
+import threading
+from importlib import metadata
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import AsyncMongoClient, UpdateOne
+from pymongo.errors import OperationFailure
+import numpy as np
+import torch
 from detoxify import Detoxify
-import pandas as pd
+from cleaning import TextCleaner
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -60,13 +74,37 @@ class ProcessingStatus(BaseModel):
 # Configuration MongoDB
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/")
 DB_NAME = "harassment_analysis"
+BULK_WRITE_SIZE = 500
+
+# Configuration Detoxify (GPU si disponible)
+DETOXIFY_DEVICE = os.getenv("DETOXIFY_DEVICE", "cuda" if torch.cuda.is_available() else "cpu")
+TOXICITY_CACHE_SIZE = int(os.getenv("TOXICITY_CACHE_SIZE", "100000"))
+
+# Threads intra-op torch par processus (à réduire avec plusieurs workers uvicorn)
+TORCH_NUM_THREADS = os.getenv("TORCH_NUM_THREADS")
+if TORCH_NUM_THREADS:
+    torch.set_num_threads(int(TORCH_NUM_THREADS))
+
+# Longueur max en tokens pour le pipeline de tweets (au plus 280 caractères);
+# les endpoints d'analyse gardent la longueur max du modèle
+DETOXIFY_MAX_LENGTH = int(os.getenv("DETOXIFY_MAX_LENGTH", "96"))
+
+# Moteur d'inférence: "torch", "onnx" ou "onnx-int8" (quantification dynamique)
+DETOXIFY_BACKENDS = ("torch", "onnx", "onnx-int8")
+DETOXIFY_BACKEND = os.getenv("DETOXIFY_BACKEND", "torch")
+if DETOXIFY_BACKEND not in DETOXIFY_BACKENDS:
+    raise ValueError(
+        f"DETOXIFY_BACKEND invalide: {DETOXIFY_BACKEND!r} "
+        f"(valeurs possibles: {', '.join(DETOXIFY_BACKENDS)})"
+    )
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx-models")
 
 class DatabaseManager:
-    """Gestionnaire de base de données MongoDB"""
+    """Gestionnaire de base de données MongoDB (client asynchrone PyMongo)"""
     
     def __init__(self):
         try:
-            self.client = MongoClient(MONGO_URL)
+            self.client = AsyncMongoClient(MONGO_URL)
             self.db = self.client[DB_NAME]
             self.posts_collection = self.db["posts"]
             self.analysis_collection = self.db["toxicity_analysis"]
@@ -75,87 +113,98 @@ class DatabaseManager:
             logger.error(f"❌ Erreur connexion MongoDB: {e}")
             raise
     
-    def save_post(self, post_data: dict):
-        """Sauvegarder un post dans MongoDB"""
-        try:
-            # Vérifier si le post existe déjà
-            existing = self.posts_collection.find_one({"id": post_data["id"]})
-            if existing:
-                logger.info(f"Post {post_data['id']} déjà existant, mise à jour")
-                self.posts_collection.update_one(
-                    {"id": post_data["id"]}, 
-                    {"$set": post_data}
+    async def ensure_indexes(self):
+        """Créer les index uniques sur l'id (idempotent)
+        
+        Si une collection contient déjà des id en double, l'index ne peut pas
+        être créé: l'erreur est journalisée et le démarrage continue sans cet
+        index (les upserts groupés restent fonctionnels).
+        """
+        for collection in (self.posts_collection, self.analysis_collection):
+            try:
+                await collection.create_index("id", unique=True)
+            except OperationFailure as e:
+                logger.error(
+                    f"❌ Index unique sur 'id' impossible pour la collection "
+                    f"{collection.name} (doublons existants ?): {e}"
                 )
-            else:
-                self.posts_collection.insert_one(post_data)
-                logger.info(f"✅ Post {post_data['id']} sauvegardé")
+    
+    async def _bulk_upsert(self, collection, docs: List[dict]):
+        """Upsert groupé de documents par leur id"""
+        if not docs:
+            return
+        ops = [UpdateOne({"id": d["id"]}, {"$set": d}, upsert=True) for d in docs]
+        await collection.bulk_write(ops, ordered=False)
+    
+    async def bulk_upsert_posts(self, docs: List[dict]):
+        """Sauvegarder un lot de posts en une seule requête"""
+        try:
+            await self._bulk_upsert(self.posts_collection, docs)
+            logger.debug("✅ %d posts sauvegardés", len(docs))
         except Exception as e:
-            logger.error(f"❌ Erreur sauvegarde post: {e}")
+            logger.error(f"❌ Erreur sauvegarde groupée posts: {e}")
             raise
     
-    def save_analysis(self, analysis_data: dict):
-        """Sauvegarder une analyse de toxicité"""
+    async def bulk_upsert_analyses(self, docs: List[dict]):
+        """Sauvegarder un lot d'analyses en une seule requête"""
         try:
-            # Vérifier si l'analyse existe déjà
-            existing = self.analysis_collection.find_one({"id": analysis_data["id"]})
-            if existing:
-                self.analysis_collection.update_one(
-                    {"id": analysis_data["id"]}, 
-                    {"$set": analysis_data}
-                )
-            else:
-                self.analysis_collection.insert_one(analysis_data)
-                logger.info(f"✅ Analyse {analysis_data['id']} sauvegardée")
+            await self._bulk_upsert(self.analysis_collection, docs)
+            logger.debug("✅ %d analyses sauvegardées", len(docs))
         except Exception as e:
-            logger.error(f"❌ Erreur sauvegarde analyse: {e}")
+            logger.error(f"❌ Erreur sauvegarde groupée analyses: {e}")
             raise
     
-    def get_posts(self, limit: int = 100):
-        """Récupérer les posts de la base"""
+    async def get_stats(self) -> Dict:
+        """Compteurs et moyennes des analyses"""
+        # Compter les posts (métadonnées de la collection)
+        total_posts = await self.posts_collection.estimated_document_count()
+        
+        # Compteurs et moyennes des analyses en un seul passage
+        pipeline = [
+            {
+                "$group": {
+                    "_id": None,
+                    "total": {"$sum": 1},
+                    "toxic": {"$sum": {"$cond": ["$is_toxic", 1, 0]}},
+                    "avg_toxicity": {"$avg": "$toxicity"},
+                    "avg_threat": {"$avg": "$threat"},
+                    "avg_insult": {"$avg": "$insult"}
+                }
+            }
+        ]
+        
+        cursor = await self.analysis_collection.aggregate(pipeline)
+        results = await cursor.to_list(length=1)
+        averages = results[0] if results else {}
+        
+        return {
+            "total_posts": total_posts,
+            "total_analyses": averages.get("total", 0),
+            "toxic_posts": averages.get("toxic", 0),
+            "averages": averages
+        }
+    
+    async def iter_posts(self, limit: int = 100):
+        """Parcourir les posts de la base sans les charger en mémoire"""
         try:
-            posts = list(self.posts_collection.find({}, {"_id": 0}).limit(limit))
-            return posts
+            async for post in self.posts_collection.find({}, {"_id": 0}).limit(limit):
+                yield post
         except Exception as e:
             logger.error(f"❌ Erreur récupération posts: {e}")
-            return []
     
-    def get_analysis(self, limit: int = 100):
-        """Récupérer les analyses de toxicité"""
+    async def iter_analysis(self, limit: int = 100):
+        """Parcourir les analyses de toxicité sans les charger en mémoire"""
         try:
-            analyses = list(self.analysis_collection.find({}, {"_id": 0}).limit(limit))
-            return analyses
+            async for analysis in self.analysis_collection.find({}, {"_id": 0}).limit(limit):
+                yield analysis
         except Exception as e:
             logger.error(f"❌ Erreur récupération analyses: {e}")
-            return []
 
-class TextCleaner:
-    """Nettoyeur de texte pour les posts"""
-    
-    @staticmethod
-    def clean_text(text: str) -> str:
-        """Nettoie le texte des posts"""
-        if not text:
-            return ""
-        
-        # Supprimer les URLs
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-        
-        # Supprimer les mentions (@username)
-        text = re.sub(r'@\w+', '', text)
-        
-        # Supprimer les hashtags mais garder le texte
-        text = re.sub(r'#(\w+)', r'\1', text)
-        
-        # Supprimer les caractères spéciaux en excès
-        text = re.sub(r'[^\w\s\.\!\?\,\:\;\-]', '', text)
-        
-        # Supprimer les espaces multiples
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Supprimer les espaces en début/fin
-        text = text.strip()
-        
-        return text
+def batch(iterable: List, n: int = 1):
+    """Découpe une liste en lots de taille n"""
+    length = len(iterable)
+    for ndx in range(0, length, n):
+        yield iterable[ndx:min(ndx + n, length)]
 
 class ToxicityAnalyzer:
     """Analyseur de toxicité utilisant Detoxify"""
@@ -163,67 +212,281 @@ class ToxicityAnalyzer:
     def __init__(self):
         try:
             # Charger le modèle Detoxify
-            self.model = Detoxify('multilingual')
-            logger.info("✅ Modèle Detoxify chargé")
+            self.device = DETOXIFY_DEVICE
+            self.model = Detoxify('multilingual', device=self.device)
+            self.model.model.eval()
+            
+            # Session ONNX Runtime optionnelle, sinon PyTorch
+            self.session = None
+            if DETOXIFY_BACKEND in ("onnx", "onnx-int8"):
+                self.session = self._load_onnx_session(quantize=DETOXIFY_BACKEND == "onnx-int8")
+            elif self.device.startswith("cuda"):
+                # Demi-précision sur GPU uniquement
+                self.model.model.half()
+            logger.info(f"✅ Modèle Detoxify chargé ({self.device}, {DETOXIFY_BACKEND})")
         except Exception as e:
             logger.error(f"❌ Erreur chargement Detoxify: {e}")
             raise
+        
+        # Cache LRU des analyses, indexé par le hash du texte
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def _export_onnx(self, path: str):
+        """Exporter le modèle Detoxify en ONNX (axes batch/séquence dynamiques)"""
+        dummy = self.model.tokenizer(["export"], return_tensors="pt").to(self.device)
+        torch.onnx.export(
+            self.model.model,
+            (dummy["input_ids"], dummy["attention_mask"]),
+            path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"}
+            },
+            opset_version=17
+        )
+        logger.info(f"✅ Modèle exporté en ONNX: {path}")
+    
+    def _load_onnx_session(self, quantize: bool = False):
+        """Charger (et exporter au besoin) la session ONNX Runtime"""
+        import onnxruntime as ort
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        
+        os.makedirs(ONNX_MODEL_DIR, exist_ok=True)
+        # Nom versionné: une mise à jour de torch ou detoxify force un nouvel export
+        tag = f"detoxify-multilingual-{metadata.version('detoxify')}-torch{torch.__version__}"
+        path = os.path.join(ONNX_MODEL_DIR, f"{tag}.onnx")
+        
+        # Écrire sous un nom temporaire puis renommer atomiquement: plusieurs
+        # workers peuvent démarrer en même temps sans lire un fichier partiel
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            self._export_onnx(tmp_path)
+            os.replace(tmp_path, path)
+        
+        if quantize:
+            int8_path = os.path.join(ONNX_MODEL_DIR, f"{tag}.int8.onnx")
+            if not os.path.exists(int8_path):
+                tmp_path = f"{int8_path}.{os.getpid()}.tmp"
+                quantize_dynamic(path, tmp_path, weight_type=QuantType.QInt8)
+                os.replace(tmp_path, int8_path)
+            path = int8_path
+        
+        available = ort.get_available_providers()
+        providers = [p for p in ["CUDAExecutionProvider", "CPUExecutionProvider"] if p in available]
+        return ort.InferenceSession(path, providers=providers)
+    
+    def _predict(self, texts: List[str], max_length: Optional[int] = None) -> Dict[str, List[float]]:
+        """Scores Detoxify d'un lot de textes (dict de listes par label)
+        
+        Sans max_length, les entrées sont tronquées à la longueur max du
+        modèle, comme avec Detoxify.predict.
+        """
+        if self.session is not None:
+            inputs = self.model.tokenizer(
+                texts, padding=True, truncation=True,
+                max_length=max_length, return_tensors="np"
+            )
+            logits = self.session.run(None, {
+                "input_ids": inputs["input_ids"],
+                "attention_mask": inputs["attention_mask"]
+            })[0]
+            scores = 1 / (1 + np.exp(-logits))
+        else:
+            inputs = self.model.tokenizer(
+                texts, padding=True, truncation=True,
+                max_length=max_length, return_tensors="pt"
+            ).to(self.device)
+            with torch.inference_mode():
+                logits = self.model.model(
+                    input_ids=inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"]
+                )[0]
+            scores = torch.sigmoid(logits).float().cpu().numpy()
+        
+        return {label: scores[:, i].tolist() for i, label in enumerate(self.model.class_names)}
+    
+    @staticmethod
+    def _cache_key(text: str, max_length: Optional[int] = None) -> bytes:
+        """Clé de cache d'un texte (la troncature change les scores)"""
+        raw = f"{max_length}:{text}".encode('utf-8')
+        return hashlib.blake2b(raw, digest_size=16).digest()
+    
+    def _cache_get(self, key: bytes) -> Optional[Dict]:
+        """Récupère une analyse en cache"""
+        with self._cache_lock:
+            analysis = self._cache.get(key)
+            if analysis is not None:
+                self._cache.move_to_end(key)
+            return analysis
+    
+    def _cache_put(self, key: bytes, analysis: Dict):
+        """Met une analyse en cache en évinçant les plus anciennes"""
+        with self._cache_lock:
+            self._cache[key] = analysis
+            self._cache.move_to_end(key)
+            while len(self._cache) > TOXICITY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+    
+    @staticmethod
+    def _build_analysis(results: Dict) -> Dict:
+        """Construit le résultat d'analyse à partir des scores Detoxify"""
+        # Déterminer si le texte est toxique (seuil: 0.7)
+        is_toxic = bool(results['toxicity'] > 0.7)
+        
+        # Déterminer le niveau de confiance
+        max_score = max(results.values())
+        if max_score > 0.8:
+            confidence = "high"
+        elif max_score > 0.5:
+            confidence = "medium"
+        else:
+            confidence = "low"
+        
+        return {
+            'toxicity': float(results['toxicity']),
+            'severe_toxicity': float(results['severe_toxicity']),
+            'obscene': float(results['obscene']),
+            'threat': float(results['threat']),
+            'insult': float(results['insult']),
+            'identity_attack': float(results['identity_attack']),
+            'is_toxic': is_toxic,
+            'confidence_level': confidence
+        }
+    
+    @staticmethod
+    def _default_analysis() -> Dict:
+        """Valeurs par défaut en cas d'erreur"""
+        return {
+            'toxicity': 0.0,
+            'severe_toxicity': 0.0,
+            'obscene': 0.0,
+            'threat': 0.0,
+            'insult': 0.0,
+            'identity_attack': 0.0,
+            'is_toxic': False,
+            'confidence_level': 'error'
+        }
     
     def analyze_toxicity(self, text: str) -> Dict:
         """Analyse la toxicité d'un texte"""
+        key = self._cache_key(text)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return dict(cached)
+        
         try:
             # Analyser avec Detoxify
-            results = self.model.predict(text)
-            
-            # Déterminer si le texte est toxique (seuil: 0.7)
-            is_toxic = bool(results['toxicity'] > 0.7)
-            
-            # Déterminer le niveau de confiance
-            max_score = max(results.values())
-            if max_score > 0.8:
-                confidence = "high"
-            elif max_score > 0.5:
-                confidence = "medium"
-            else:
-                confidence = "low"
-            
-            analysis = {
-                'toxicity': float(results['toxicity']),
-                'severe_toxicity': float(results['severe_toxicity']),
-                'obscene': float(results['obscene']),
-                'threat': float(results['threat']),
-                'insult': float(results['insult']),
-                'identity_attack': float(results['identity_attack']),
-                'is_toxic': is_toxic,
-                'confidence_level': confidence
-            }
-            
-            return analysis
+            results = {label: scores[0] for label, scores in self._predict([text]).items()}
+            analysis = self._build_analysis(results)
+            self._cache_put(key, analysis)
+            return dict(analysis)
             
         except Exception as e:
             logger.error(f"❌ Erreur analyse toxicité: {e}")
             # Retourner des valeurs par défaut en cas d'erreur
-            return {
-                'toxicity': 0.0,
-                'severe_toxicity': 0.0,
-                'obscene': 0.0,
-                'threat': 0.0,
-                'insult': 0.0,
-                'identity_attack': 0.0,
-                'is_toxic': False,
-                'confidence_level': 'error'
-            }
+            return self._default_analysis()
+    
+    def analyze_batch(self, texts: List[str], batch_size: int = 32,
+                      max_length: Optional[int] = None) -> List[Dict]:
+        """Analyse la toxicité d'une liste de textes par lots"""
+        keys = [self._cache_key(text, max_length) for text in texts]
+        
+        # Ne passer au modèle que les textes absents du cache (sans doublons)
+        analyses = {}
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key in analyses or key in pending:
+                continue
+            cached = self._cache_get(key)
+            if cached is not None:
+                analyses[key] = cached
+            else:
+                pending[key] = text
+        
+        for chunk_keys in batch(list(pending), batch_size):
+            chunk = [pending[key] for key in chunk_keys]
+            try:
+                # Un seul passage du modèle par lot (dict de listes)
+                results = self._predict(chunk, max_length)
+                for i, key in enumerate(chunk_keys):
+                    row = {label: scores[i] for label, scores in results.items()}
+                    analysis = self._build_analysis(row)
+                    self._cache_put(key, analysis)
+                    analyses[key] = analysis
+            except Exception as e:
+                logger.error(f"❌ Erreur analyse toxicité (lot): {e}")
+                for key in chunk_keys:
+                    analyses[key] = self._default_analysis()
+        
+        return [dict(analyses[key]) for key in keys]
+
+# Pool de threads pour le travail bloquant (regex, fichiers)
+EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+# Pool dédié à l'inférence Detoxify: chaque passage du modèle utilise déjà
+# les threads intra-op de torch, inutile d'en lancer plusieurs en parallèle
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+INFERENCE_EXECUTOR = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS)
+
+async def run_blocking(fn, *args):
+    """Exécute une fonction bloquante sans bloquer la boucle d'événements"""
+    return await asyncio.get_running_loop().run_in_executor(EXECUTOR, fn, *args)
+
+async def run_inference(fn, *args):
+    """Exécute une inférence Detoxify dans le pool dédié"""
+    return await asyncio.get_running_loop().run_in_executor(INFERENCE_EXECUTOR, fn, *args)
+
+async def create_indexes(db_manager: DatabaseManager):
+    """Crée les index MongoDB sans bloquer le démarrage"""
+    try:
+        await db_manager.ensure_indexes()
+    except Exception as e:
+        logger.error(f"❌ Erreur création des index MongoDB: {e}")
+
+async def load_toxicity_analyzer(app: FastAPI):
+    """Charge Detoxify en arrière-plan; les routes d'analyse répondent 503 d'ici là"""
+    try:
+        app.state.toxicity_analyzer = await run_blocking(ToxicityAnalyzer)
+    except Exception as e:
+        logger.error(f"❌ Detoxify indisponible: {e}")
+
+def get_toxicity_analyzer(request: Request) -> ToxicityAnalyzer:
+    """Analyseur chargé, ou 503 tant que le modèle n'est pas prêt"""
+    toxicity_analyzer = request.app.state.toxicity_analyzer
+    if toxicity_analyzer is None:
+        raise HTTPException(status_code=503, detail="Modèle Detoxify en cours de chargement")
+    return toxicity_analyzer
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarre le worker sans attendre MongoDB ni le chargement de Detoxify"""
+    app.state.db_manager = DatabaseManager()
+    app.state.toxicity_analyzer = None
+    startup_tasks = [
+        asyncio.create_task(create_indexes(app.state.db_manager)),
+        asyncio.create_task(load_toxicity_analyzer(app))
+    ]
+    try:
+        yield
+    finally:
+        for task in startup_tasks:
+            task.cancel()
+        await app.state.db_manager.client.close()
 
 # Initialisation
 app = FastAPI(
     title="API d'Analyse de Harcèlement",
     description="API pour nettoyer, analyser la toxicité et stocker les posts sur le harcèlement",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-db_manager = DatabaseManager()
 text_cleaner = TextCleaner()
-toxicity_analyzer = ToxicityAnalyzer()
 
 # Routes API
 
@@ -237,22 +500,32 @@ async def root():
             "/upload-posts",
             "/clean-text",
             "/analyze-toxicity",
+            "/analyze-toxicity-batch",
             "/process-file",
             "/get-posts",
             "/get-analysis",
-            "/stats"
+            "/stats",
+            "/healthz"
         ]
     }
 
+@app.get("/healthz")
+async def healthz(request: Request):
+    """Sonde de disponibilité"""
+    return {
+        "status": "ok",
+        "model_loaded": request.app.state.toxicity_analyzer is not None
+    }
+
 @app.post("/upload-posts")
-async def upload_posts(posts: List[SocialPost]):
+async def upload_posts(posts: List[SocialPost], request: Request):
     """Upload des posts vers la base de données"""
     try:
-        processed = 0
-        for post in posts:
-            post_data = post.dict()
-            db_manager.save_post(post_data)
-            processed += 1
+        db_manager = request.app.state.db_manager
+        posts_data = [post.dict() for post in posts]
+        for chunk in batch(posts_data, BULK_WRITE_SIZE):
+            await db_manager.bulk_upsert_posts(chunk)
+        processed = len(posts_data)
         
         return {
             "status": "success",
@@ -266,7 +539,7 @@ async def upload_posts(posts: List[SocialPost]):
 async def clean_text_endpoint(text: str):
     """Nettoie un texte"""
     try:
-        cleaned = text_cleaner.clean_text(text)
+        cleaned = await run_blocking(text_cleaner.clean_text, text)
         return {
             "original": text,
             "cleaned": cleaned
@@ -275,25 +548,51 @@ async def clean_text_endpoint(text: str):
         raise HTTPException(status_code=500, detail=f"Erreur nettoyage: {str(e)}")
 
 @app.post("/analyze-toxicity")
-async def analyze_toxicity_endpoint(text: str):
+async def analyze_toxicity_endpoint(text: str, request: Request):
     """Analyse la toxicité d'un texte"""
+    toxicity_analyzer = get_toxicity_analyzer(request)
     try:
-        analysis = toxicity_analyzer.analyze_toxicity(text)
+        analysis = await run_inference(toxicity_analyzer.analyze_toxicity, text)
         return analysis
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur analyse: {str(e)}")
 
+@app.post("/analyze-toxicity-batch")
+async def analyze_toxicity_batch_endpoint(texts: List[str], request: Request):
+    """Analyse la toxicité d'une liste de textes"""
+    toxicity_analyzer = get_toxicity_analyzer(request)
+    try:
+        analyses = await run_inference(toxicity_analyzer.analyze_batch, texts)
+        return {
+            "count": len(analyses),
+            "analyses": analyses
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur analyse: {str(e)}")
+
 @app.post("/process-file")
-async def process_file(background_tasks: BackgroundTasks):
-    """Traite le fichier JSON des posts collectés"""
+async def process_file(file: UploadFile, background_tasks: BackgroundTasks, request: Request):
+    """Traite un fichier JSON de posts collectés (upload)"""
+    toxicity_analyzer = get_toxicity_analyzer(request)
     try:
-        # Vérifier si le fichier existe
-        file_path = "harassment_posts.json"
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail="Fichier harassment_posts.json non trouvé")
+        # L'upload est fermé après la réponse: le transférer pour la tâche de fond
+        spool = tempfile.TemporaryFile()
+        try:
+            await file.seek(0)
+            await run_blocking(shutil.copyfileobj, file.file, spool)
+            spool.seek(0)
+        except Exception:
+            spool.close()
+            raise
         
         # Lancer le traitement en arrière-plan
-        background_tasks.add_task(process_posts_background, file_path)
+        background_tasks.add_task(
+            process_posts_background,
+            spool,
+            file.filename,
+            request.app.state.db_manager,
+            toxicity_analyzer
+        )
         
         return {
             "status": "processing",
@@ -302,102 +601,96 @@ async def process_file(background_tasks: BackgroundTasks):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur traitement: {str(e)}")
 
-async def process_posts_background(file_path: str):
+async def process_posts_batch(posts_data: List[dict], db_manager: DatabaseManager,
+                             toxicity_analyzer: ToxicityAnalyzer):
+    """Nettoie, analyse et sauvegarde un lot de posts"""
+    # Nettoyer les textes
+    cleaned_texts = await run_blocking(
+        text_cleaner.clean_texts, [p['text'] for p in posts_data]
+    )
+    
+    # Analyser la toxicité par lots
+    analyses = await run_inference(
+        toxicity_analyzer.analyze_batch, cleaned_texts, 32, DETOXIFY_MAX_LENGTH
+    )
+    
+    post_records, analysis_records = [], []
+    for post_data, cleaned_text, toxicity_analysis in zip(posts_data, cleaned_texts, analyses):
+        # Préparer les données pour la base
+        post_records.append({
+            **post_data,
+            'cleaned_text': cleaned_text,
+            'processed_at': datetime.now().isoformat()
+        })
+        
+        analysis_records.append({
+            'id': post_data['id'],
+            'text': cleaned_text,
+            'analyzed_at': datetime.now().isoformat(),
+            **toxicity_analysis
+        })
+    
+    # Sauvegarder en base (les deux écritures en parallèle)
+    await asyncio.gather(
+        db_manager.bulk_upsert_posts(post_records),
+        db_manager.bulk_upsert_analyses(analysis_records)
+    )
+
+async def process_posts_background(f: BinaryIO, filename: str, db_manager: DatabaseManager,
+                                   toxicity_analyzer: ToxicityAnalyzer):
     """Traite les posts en arrière-plan"""
     try:
-        # Charger les posts
-        with open(file_path, 'r', encoding='utf-8') as f:
-            posts_data = json.load(f)
-        
         processed = 0
-        total = len(posts_data)
-        logger.info(f"🚀 Début traitement de {total} posts")
+        logger.info(f"🚀 Début traitement de {filename}")
         
-        for post_data in posts_data:
-            # Nettoyer le texte
-            cleaned_text = text_cleaner.clean_text(post_data['text'])
-            
-            # Analyser la toxicité
-            toxicity_analysis = toxicity_analyzer.analyze_toxicity(cleaned_text)
-            
-            # Préparer les données pour la base
-            post_record = {
-                **post_data,
-                'cleaned_text': cleaned_text,
-                'processed_at': datetime.now().isoformat()
-            }
-            
-            analysis_record = {
-                'id': post_data['id'],
-                'text': cleaned_text,
-                'analyzed_at': datetime.now().isoformat(),
-                **toxicity_analysis
-            }
-            
-            # Sauvegarder en base
-            db_manager.save_post(post_record)
-            db_manager.save_analysis(analysis_record)
-            
-            processed += 1
-            if processed % 10 == 0:
-                logger.info(f"📊 Traité: {processed}/{total}")
+        with f:
+            # Lecture incrémentale du tableau JSON, lot par lot
+            stream = ijson.items(f, 'item', use_float=True)
+            while True:
+                posts_data = await run_blocking(lambda: list(islice(stream, BULK_WRITE_SIZE)))
+                if not posts_data:
+                    break
+                
+                await process_posts_batch(posts_data, db_manager, toxicity_analyzer)
+                
+                processed += len(posts_data)
+                logger.info("📊 Traité: %d", processed)
         
         logger.info(f"✅ Traitement terminé: {processed} posts traités")
         
     except Exception as e:
         logger.error(f"❌ Erreur traitement background: {e}")
 
+async def ndjson_lines(docs):
+    """Sérialise des documents en lignes NDJSON"""
+    async for doc in docs:
+        yield orjson.dumps(doc) + b"\n"
+
 @app.get("/get-posts")
-async def get_posts(limit: int = 100):
-    """Récupère les posts de la base"""
-    try:
-        posts = db_manager.get_posts(limit)
-        return {
-            "count": len(posts),
-            "posts": posts
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur récupération: {str(e)}")
+async def get_posts(request: Request, limit: int = 100):
+    """Récupère les posts de la base (flux NDJSON)"""
+    return StreamingResponse(
+        ndjson_lines(request.app.state.db_manager.iter_posts(limit)),
+        media_type="application/x-ndjson"
+    )
 
 @app.get("/get-analysis")
-async def get_analysis(limit: int = 100):
-    """Récupère les analyses de toxicité"""
-    try:
-        analyses = db_manager.get_analysis(limit)
-        return {
-            "count": len(analyses),
-            "analyses": analyses
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur récupération: {str(e)}")
+async def get_analysis(request: Request, limit: int = 100):
+    """Récupère les analyses de toxicité (flux NDJSON)"""
+    return StreamingResponse(
+        ndjson_lines(request.app.state.db_manager.iter_analysis(limit)),
+        media_type="application/x-ndjson"
+    )
 
 @app.get("/stats")
-async def get_stats():
+async def get_stats(request: Request):
     """Statistiques globales"""
     try:
-        # Compter les posts
-        total_posts = db_manager.posts_collection.count_documents({})
-        
-        # Compter les analyses
-        total_analyses = db_manager.analysis_collection.count_documents({})
-        
-        # Statistiques de toxicité
-        toxic_posts = db_manager.analysis_collection.count_documents({"is_toxic": True})
-        
-        # Moyennes des scores
-        pipeline = [
-            {
-                "$group": {
-                    "_id": None,
-                    "avg_toxicity": {"$avg": "$toxicity"},
-                    "avg_threat": {"$avg": "$threat"},
-                    "avg_insult": {"$avg": "$insult"}
-                }
-            }
-        ]
-        
-        avg_results = list(db_manager.analysis_collection.aggregate(pipeline))
-        averages = avg_results[0] if avg_results else {}
+        stats = await request.app.state.db_manager.get_stats()
+        total_posts = stats["total_posts"]
+        total_analyses = stats["total_analyses"]
+        toxic_posts = stats["toxic_posts"]
+        averages = stats["averages"]
         
         return {
             "total_posts": total_posts,
@@ -415,4 +708,4 @@ async def get_stats():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run("api:app", host="0.0.0.0", port=8000, workers=int(os.getenv("API_WORKERS", "1")))
\ No newline at end of file
@@ -1,5 +1,5 @@
 import tweepy
-import json
+import orjson
 import csv
 import logging
 from datetime import datetime
@@ -80,8 +80,8 @@ class TwitterHarassmentCollector:
     def save_to_json(self, posts: List[Dict], filename: str = "harassment_posts.json"):
         """Sauvegarder les posts en JSON"""
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(posts, f, ensure_ascii=False, indent=2)
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(posts, option=orjson.OPT_INDENT_2))
             logger.info(f"✅ Données sauvegardées dans {filename}")
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde JSON: {e}")
@@ -0,0 +1,43 @@
+import re
+from typing import List, Optional
+
+# Expressions régulières précompilées pour le nettoyage
+_URL_RE = re.compile(r'https?://\S+')
+_MENTION_RE = re.compile(r'@\w+')
+_HASHTAG_RE = re.compile(r'#(\w+)')
+_SPECIAL_RE = re.compile(r'[^\w\s.!?,:;\-]')
+_WS_RE = re.compile(r'\s+')
+
+class TextCleaner:
+    """Nettoyeur de texte pour les posts"""
+    
+    @staticmethod
+    def clean_text(text: str) -> str:
+        """Nettoie le texte des posts"""
+        if not text:
+            return ""
+        
+        # Supprimer les URLs
+        text = _URL_RE.sub('', text)
+        
+        # Supprimer les mentions (@username)
+        text = _MENTION_RE.sub('', text)
+        
+        # Supprimer les hashtags mais garder le texte
+        text = _HASHTAG_RE.sub(r'\1', text)
+        
+        # Supprimer les caractères spéciaux en excès
+        text = _SPECIAL_RE.sub('', text)
+        
+        # Supprimer les espaces multiples
+        text = _WS_RE.sub(' ', text)
+        
+        # Supprimer les espaces en début/fin
+        text = text.strip()
+        
+        return text
+    
+    @staticmethod
+    def clean_texts(texts: List[Optional[str]]) -> List[str]:
+        """Nettoie une liste de textes (None donne une chaîne vide)"""
+        return [TextCleaner.clean_text(text) for text in texts]
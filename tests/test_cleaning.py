@@ -0,0 +1,46 @@
+import re
+
+import pytest
+
+from cleaning import TextCleaner
+
+
+def sequential_clean(text: str) -> str:
+    """Nettoyeur de référence en cinq passes successives"""
+    if not text:
+        return ""
+    text = re.sub(r'https?://\S+', '', text)
+    text = re.sub(r'@\w+', '', text)
+    text = re.sub(r'#(\w+)', r'\1', text)
+    text = re.sub(r'[^\w\s.!?,:;\-]', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+CASES = [
+    "",
+    "Check this link http://example.com @user123 #harcèlement !!! 😡😡",
+    "a#b @ # ## #x@y foo@bar.com",
+    "x http://a.b/#frag @@u",
+    "#tag#tag2",
+    "@http://t.co/abc",
+    "#https://t.co/abc",
+    "@ahttp://t.co/abc fin",
+    "#foohttps://t.co/abc fin",
+    "@#foohttp://t.co",
+    "#a#bhttp://x",
+    "@xhttp:// reste",
+    "ab@cdhttp://x",
+    "Espaces   multiples\n\tet  fin   ",
+    "ponctuation: ok; oui, non? non! tiret - point.",
+]
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_clean_text_matches_sequential_cleaner(text):
+    assert TextCleaner.clean_text(text) == sequential_clean(text)
+
+
+def test_clean_texts_matches_clean_text():
+    texts = CASES + [None]
+    assert TextCleaner.clean_texts(texts) == [TextCleaner.clean_text(t) for t in texts]
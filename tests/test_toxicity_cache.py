@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+import pytest
+
+api = pytest.importorskip("api")
+
+LABELS = ['toxicity', 'severe_toxicity', 'obscene', 'threat', 'insult', 'identity_attack']
+
+
+def make_analyzer(predict):
+    """Analyseur sans modèle chargé: seul _predict est remplacé"""
+    analyzer = api.ToxicityAnalyzer.__new__(api.ToxicityAnalyzer)
+    analyzer.device = "cpu"
+    analyzer.session = None
+    analyzer._cache = OrderedDict()
+    analyzer._cache_lock = threading.Lock()
+    analyzer._predict = predict
+    return analyzer
+
+
+class FakePredict:
+    """Score de toxicité = longueur du texte / 100, et trace des appels"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, max_length=None):
+        self.calls.append(list(texts))
+        scores = [len(text) / 100 for text in texts]
+        return {label: list(scores) for label in LABELS}
+
+
+def test_duplicates_and_cached_texts_skip_model():
+    predict = FakePredict()
+    analyzer = make_analyzer(predict)
+
+    analyzer.analyze_batch(["dejà vu"])
+    results = analyzer.analyze_batch(["a", "dejà vu", "bb", "a", "bb", "a"], batch_size=2)
+
+    sent = [text for call in predict.calls[1:] for text in call]
+    assert sorted(sent) == ["a", "bb"]
+    assert all(len(call) <= 2 for call in predict.calls)
+    assert [r['toxicity'] for r in results] == [0.01, 0.07, 0.02, 0.01, 0.02, 0.01]
+
+
+def test_max_length_is_part_of_cache_key():
+    predict = FakePredict()
+    analyzer = make_analyzer(predict)
+
+    analyzer.analyze_batch(["texte"])
+    analyzer.analyze_batch(["texte"], max_length=96)
+
+    assert predict.calls == [["texte"], ["texte"]]
+
+
+def test_error_fallback_is_not_cached():
+    calls = []
+
+    def failing_predict(texts, max_length=None):
+        calls.append(list(texts))
+        raise RuntimeError("boom")
+
+    analyzer = make_analyzer(failing_predict)
+
+    results = analyzer.analyze_batch(["x", "y", "x"])
+    assert [r['confidence_level'] for r in results] == ['error'] * 3
+    assert len(analyzer._cache) == 0
+
+    analyzer._predict = FakePredict()
+    results = analyzer.analyze_batch(["x", "y"])
+    assert analyzer._predict.calls == [["x", "y"]]
+    assert [r['confidence_level'] for r in results] == ['low', 'low']
+
+
+def test_returned_analyses_are_copies():
+    analyzer = make_analyzer(FakePredict())
+
+    first = analyzer.analyze_batch(["z"])[0]
+    first['toxicity'] = 1.0
+
+    assert analyzer.analyze_batch(["z"])[0]['toxicity'] == 0.01